@@ -22,19 +22,24 @@
 # --
 
 """Feature generation module."""
+from functools import lru_cache
 import os
 import sys
-from typing import Any
+import tempfile
+import threading
+from typing import Any, Callable
 
 from DiverseSelector.utils import ExplicitBitVector, mol_loader, PandasDataFrame, RDKitMol
+from joblib import delayed, effective_n_jobs, Parallel
 from mordred import Calculator, descriptors
 import numpy as np
 from padelpy import padeldescriptor
 import pandas as pd
 # from padelpy import from_sdf
-from rdkit import Chem
+from rdkit import Chem, DataStructs
 from rdkit.Chem import AllChem, Descriptors, MACCSkeys, rdMHFPFingerprint
 from sklearn.preprocessing import StandardScaler
+from sklearn.utils import gen_even_slices
 
 __all__ = [
     "DescriptorGenerator",
@@ -42,11 +47,17 @@ __all__ = [
     "feature_filtering",
     "feature_reader",
     "compute_features",
+    "pack_fingerprints",
 ]
 
 cwd = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.join(cwd, "padelpy"))
 
+# RDKit fragment descriptors, http://rdkit.org/docs/source/rdkit.Chem.Fragments.html
+_FRAG_DESCLIST = tuple(Descriptors.descList[115:])
+_FRAG_NAMES = tuple(name for name, _ in _FRAG_DESCLIST)
+_FRAG_FUNCS = tuple(function for _, function in _FRAG_DESCLIST)
+
 
 class DescriptorGenerator:
     """Molecular descriptor generator."""
@@ -57,6 +68,7 @@ class DescriptorGenerator:
                  desc_type: str = "mordred",
                  use_fragment: bool = True,
                  ipc_avg: bool = True,
+                 n_jobs: int = None,
                  ) -> None:
         """Molecular descriptor calculations.
 
@@ -74,6 +86,10 @@ class DescriptorGenerator:
             Default=True.
         ipc_avg : bool, optional
             If True, the IPC descriptor calculates with avg=True option. Default=True.
+        n_jobs : int, optional
+            Number of parallel jobs used for the descriptor calculations, where -1 means using all
+            the processors. If None, Mordred uses all the processors and the RDKit descriptors are
+            computed serially. Default=None.
 
         """
         self.mols = mols
@@ -81,6 +97,7 @@ class DescriptorGenerator:
         self.desc_type = desc_type
         self.use_fragment = use_fragment
         self.ipc_avg = ipc_avg
+        self.n_jobs = n_jobs
         # self.__dict__.update(kwargs)
 
     def compute_descriptor(self,
@@ -88,7 +105,7 @@ class DescriptorGenerator:
                            ) -> PandasDataFrame:
         """Molecule descriptor generation."""
         if self.desc_type.lower() == "mordred":
-            df_features = self.mordred_descriptors(mols=self.mols, **kwargs)
+            df_features = self.mordred_descriptors(mols=self.mols, n_jobs=self.n_jobs, **kwargs)
         elif self.desc_type.lower() == "padel":
             df_features = self.padelpy_descriptors(mol_file=self.mol_file,
                                                    keep_csv=False,
@@ -97,22 +114,26 @@ class DescriptorGenerator:
             df_features = self.rdkit_descriptors(mols=self.mols,
                                                  use_fragment=self.use_fragment,
                                                  ipc_avg=self.ipc_avg,
+                                                 n_jobs=self.n_jobs,
                                                  **kwargs)
         elif self.desc_type.lower() == "rdkit_frag":
-            df_features = self.rdkit_fragment_descriptors(self.mols)
+            df_features = self.rdkit_fragment_descriptors(self.mols, n_jobs=self.n_jobs)
         else:
             raise ValueError(f"Unknown descriptor type {self.desc_type}.")
 
         return df_features
 
     @staticmethod
-    def mordred_descriptors(mols: list, **kwargs: Any) -> PandasDataFrame:
+    def mordred_descriptors(mols: list, n_jobs: int = None, **kwargs: Any) -> PandasDataFrame:
         """Mordred molecular descriptor generation.
 
         Parameters
         ----------
         mols : list
             A list of molecule RDKitMol objects.
+        n_jobs : int, optional
+            Number of processes used by Mordred, where None or -1 means using all the
+            processors. Default=None.
 
         Returns
         -------
@@ -123,7 +144,11 @@ class DescriptorGenerator:
         # if only compute 2D descriptors,
         # ignore_3D=True
         calc = Calculator(descriptors, **kwargs)
-        df_features = pd.DataFrame(calc.pandas(mols))
+        nproc = None if n_jobs is None else effective_n_jobs(n_jobs)
+        df_features = calc.pandas(mols, nproc=nproc, quiet=True)
+        # failed calculations are returned as Mordred error objects, which are converted to NaN so
+        # that all the columns are numeric instead of object dtype
+        df_features = df_features.apply(pd.to_numeric, errors="coerce").astype(np.float64)
 
         return df_features
 
@@ -138,7 +163,8 @@ class DescriptorGenerator:
         mol_file : str
             Molecule file name.
         keep_csv : bool, optional
-            If True, the csv file is kept. Default=False.
+            If True, the csv file is kept in the current working directory. Otherwise, a
+            temporary csv file is used and deleted afterwards. Default=False.
         **kwargs : Any
             Additional keyword arguments.
             See https://github.com/ecrl/padelpy/blob/master/padelpy/wrapper.py.
@@ -171,20 +197,26 @@ class DescriptorGenerator:
         if mol_file is None:
             raise ValueError("Attention: a mol_file is required for padel descriptor calculations.")
 
-        csv_fname = str(os.path.basename(mol_file)).split(".", maxsplit=1)[0] + \
-            "padel_descriptors.csv"
-
-        padeldescriptor(mol_dir=mol_file,
-                        d_file=csv_fname,
-                        d_2d=True,
-                        d_3d=True,
-                        retainorder=True,
-                        **kwargs)
-
-        df_features = pd.read_csv(csv_fname, sep=",", index_col="Name")
-
-        if not keep_csv:
-            os.remove(csv_fname)
+        if keep_csv:
+            csv_fname = str(os.path.basename(mol_file)).split(".", maxsplit=1)[0] + \
+                "padel_descriptors.csv"
+        else:
+            # use a unique temporary file, so concurrent calculations do not overwrite each other
+            with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as csv_file:
+                csv_fname = csv_file.name
+
+        try:
+            padeldescriptor(mol_dir=mol_file,
+                            d_file=csv_fname,
+                            d_2d=True,
+                            d_3d=True,
+                            retainorder=True,
+                            **kwargs)
+
+            df_features = pd.read_csv(csv_fname, sep=",", index_col="Name")
+        finally:
+            if not keep_csv and os.path.exists(csv_fname):
+                os.remove(csv_fname)
 
         return df_features
 
@@ -192,6 +224,7 @@ class DescriptorGenerator:
     def rdkit_descriptors(mols: list,
                           use_fragment: bool = True,
                           ipc_avg: bool = True,
+                          n_jobs: int = 1,
                           **kwargs,
                           ) -> PandasDataFrame:
         # noqa: D403
@@ -206,6 +239,8 @@ class DescriptorGenerator:
             Default=True.
         ipc_avg : bool, optional
             If True, the IPC descriptor calculates with avg=True option. Default=True
+        n_jobs : int, optional
+            Number of parallel jobs, where -1 means using all the processors. Default=1.
         **kwargs : Any, optional
             Other parameters that can be passed to `_rdkit_descriptors_low()`.
 
@@ -216,25 +251,30 @@ class DescriptorGenerator:
 
         """
         # parsing descriptor information
-        desc_list = []
-        descriptor_types = []
-        for descriptor, function in Descriptors.descList:
-            if use_fragment is False and descriptor.startswith("fr_"):
-                continue
-            descriptor_types.append(descriptor)
-            desc_list.append((descriptor, function))
-
-        # check initialization
-        assert len(descriptor_types) == len(desc_list)
-
-        arr_features = [_rdkit_descriptors_low(mol, desc_list=desc_list, ipc_avg=ipc_avg, **kwargs)
-                        for mol in mols]
-        df_features = pd.DataFrame(arr_features, columns=descriptor_types)
+        desc_list = _get_desc_list(use_fragment)
+        descriptor_types = [descriptor for descriptor, _ in desc_list]
+
+        # RDKit descriptor functions can not be pickled, so each worker process gets a chunk of
+        # molecules and parses the descriptor information by itself
+        n_chunks = min(effective_n_jobs(n_jobs), max(len(mols), 1))
+        arr_features = np.empty((len(mols), len(desc_list)), dtype=np.float64)
+        if n_chunks == 1:
+            # fill the preallocated array in place without dispatching through joblib
+            _rdkit_descriptors_chunk(mols, use_fragment, ipc_avg, out_features=arr_features,
+                                     **kwargs)
+        else:
+            chunks = list(gen_even_slices(len(mols), n_chunks))
+            chunk_features = Parallel(n_jobs=n_jobs, prefer="processes")(
+                delayed(_rdkit_descriptors_chunk)(mols[chunk], use_fragment, ipc_avg, **kwargs)
+                for chunk in chunks)
+            for chunk, features in zip(chunks, chunk_features):
+                arr_features[chunk] = features
+        df_features = pd.DataFrame(arr_features, columns=descriptor_types, copy=False)
 
         return df_features
 
     @staticmethod
-    def rdkit_fragment_descriptors(mols: list) -> PandasDataFrame:
+    def rdkit_fragment_descriptors(mols: list, n_jobs: int = 1) -> PandasDataFrame:
         # noqa: D403
         """RDKit fragment features.
 
@@ -242,6 +282,8 @@ class DescriptorGenerator:
         ----------
         mols : list
             A list of molecule RDKitMol objects.
+        n_jobs : int, optional
+            Number of parallel jobs, where -1 means using all the processors. Default=1.
 
         Returns
         -------
@@ -252,25 +294,89 @@ class DescriptorGenerator:
         # http://rdkit.org/docs/source/rdkit.Chem.Fragments.html
         # this implementation is taken from https://github.com/Ryan-Rhys/FlowMO/blob/
         # e221d989914f906501e1ad19cd3629d88eac1785/property_prediction/data_utils.py#L111
-        fragments = {d[0]: d[1] for d in Descriptors.descList[115:]}
-        frag_features = np.zeros((len(mols), len(fragments)))
-        for idx, mol in enumerate(mols):
-            features = [fragments[d](mol) for d in fragments]
-            frag_features[idx, :] = features
+        n_chunks = min(effective_n_jobs(n_jobs), max(len(mols), 1))
+        frag_features = np.empty((len(mols), len(_FRAG_FUNCS)), dtype=np.float64)
+        if n_chunks == 1:
+            # fill the preallocated array in place without dispatching through joblib
+            _rdkit_fragment_descriptors_chunk(mols, out_features=frag_features)
+        else:
+            chunks = list(gen_even_slices(len(mols), n_chunks))
+            chunk_features = Parallel(n_jobs=n_jobs, prefer="processes")(
+                delayed(_rdkit_fragment_descriptors_chunk)(mols[chunk]) for chunk in chunks)
+            for chunk, features in zip(chunks, chunk_features):
+                frag_features[chunk] = features
 
-        feature_names = [desc[0] for desc in Descriptors.descList[115:]]
-        df_features = pd.DataFrame(data=frag_features, columns=feature_names)
+        df_features = pd.DataFrame(data=frag_features, columns=list(_FRAG_NAMES), copy=False)
 
         return df_features
 
 
+@lru_cache(maxsize=4)
+def _get_desc_list(use_fragment: bool = True) -> tuple:
+    """Parse the RDKit descriptor information.
+
+    The result is cached, so the descriptor list is only parsed once per process.
+
+    Parameters
+    ----------
+    use_fragment : bool, optional
+        If True, the fragment binary descriptors like "fr_XXX" are included. Default=True.
+
+    Returns
+    -------
+    desc_list : tuple
+        A tuple of tuples, which contain descriptor types and functions.
+    """
+    return tuple((descriptor, function) for descriptor, function in Descriptors.descList
+                 if use_fragment or not descriptor.startswith("fr_"))
+
+
+def _rdkit_descriptors_chunk(mols: list,
+                             use_fragment: bool = True,
+                             ipc_avg: bool = True,
+                             out_features: np.ndarray = None,
+                             **kwargs) -> np.ndarray:
+    """Calculate RDKit descriptors for a chunk of molecules in a worker process.
+
+    The descriptors are written into `out_features` when it is given, and into a newly allocated
+    array otherwise.
+    """
+    desc_list = _get_desc_list(use_fragment)
+    features = out_features
+    if features is None:
+        features = np.empty((len(mols), len(desc_list)), dtype=np.float64)
+    for idx, mol in enumerate(mols):
+        _rdkit_descriptors_low(mol, desc_list=desc_list, ipc_avg=ipc_avg, out_row=features[idx],
+                               **kwargs)
+
+    return features
+
+
+def _rdkit_fragment_descriptors_chunk(mols: list,
+                                      out_features: np.ndarray = None,
+                                      ) -> np.ndarray:
+    """Calculate RDKit fragment descriptors for a chunk of molecules in a worker process.
+
+    The descriptors are written into `out_features` when it is given, and into a newly allocated
+    array otherwise.
+    """
+    frag_features = out_features
+    if frag_features is None:
+        frag_features = np.empty((len(mols), len(_FRAG_FUNCS)), dtype=np.float64)
+    for idx, mol in enumerate(mols):
+        frag_features[idx] = [function(mol) for function in _FRAG_FUNCS]
+
+    return frag_features
+
+
 # this part is modified from
 # https://github.com/deepchem/deepchem/blob/master/deepchem/feat/molecule_featurizers/
 # rdkit_descriptors.py#L11-L98
 def _rdkit_descriptors_low(mol: RDKitMol,
                            desc_list: list,
                            ipc_avg: bool = True,
-                           **kwargs) -> list:
+                           out_row: np.ndarray = None,
+                           **kwargs) -> np.ndarray:
     """Calculate RDKit descriptors.
 
     Parameters
@@ -279,38 +385,88 @@ def _rdkit_descriptors_low(mol: RDKitMol,
         RDKit Mol object.
     desc_list: list
         A list of tuples, which contain descriptor types and functions.
-    use_fragment : bool, optional
-        If True, the return value includes the fragment binary descriptors like "fr_XXX".
-        Default=True.
     ipc_avg : bool, optional
         If True, the IPC descriptor calculates with avg=True option. Default=True
+    out_row : np.ndarray, optional
+        Preallocated 1D array of length `len(desc_list)` that is filled in place. If None, a new
+        array is allocated. Default=None.
+    **kwargs : Any, optional
+        Not used, but accepted so that extra keyword arguments can be passed through
+        `DescriptorGenerator.rdkit_descriptors()`.
 
     Returns
     -------
-    features : list
-        1D list of RDKit descriptors for `mol`. The length is `len(descriptors)`.
+    features : np.ndarray
+        1D array of RDKit descriptors for `mol`. The length is `len(desc_list)`.
     """
-    if "mol" in kwargs:
-        mol = kwargs.get("mol")
-        raise DeprecationWarning(
-            "Mol is being phased out as a parameter, please pass RDKit mol object instead.")
-
-    features = []
-    for desc_name, function in desc_list:
+    features = np.empty(len(desc_list), dtype=np.float64) if out_row is None else out_row
+    for idx, (desc_name, function) in enumerate(desc_list):
         if desc_name == "Ipc" and ipc_avg:
-            feature = function(mol, avg=True)
+            features[idx] = function(mol, avg=True)
         else:
-            feature = function(mol)
-        features.append(feature)
-    # return np.asarray(features)
+            features[idx] = function(mol)
+
     return features
 
 
 # feature selection
-def feature_filtering():
-    """Feature selection."""
-    # todo: add feature selection for binary fingerprints
-    pass
+def feature_filtering(df_features: PandasDataFrame,
+                      var_thresh: float = 1e-5,
+                      corr_thresh: float = 0.95,
+                      ) -> PandasDataFrame:
+    """Feature selection by removing low variance and highly correlated features.
+
+    Missing values (NaN), e.g. descriptors that failed for some molecules, are ignored. The
+    variance of a feature is computed from its available values and the correlation of two
+    features from the molecules where both are available. Features without any available value
+    are removed.
+
+    Parameters
+    ----------
+    df_features : PandasDataFrame
+        A `pandas.DataFrame` object of molecular features with shape (n_mols, n_features).
+    var_thresh : float, optional
+        Features with a variance not greater than this threshold are removed. Default=1e-5.
+    corr_thresh : float, optional
+        A feature is removed when the absolute value of its Pearson correlation coefficient with
+        any preceding feature is greater than this threshold. Default=0.95.
+
+    Returns
+    -------
+    df_filtered : PandasDataFrame
+        A `pandas.DataFrame` object with the selected features, which keeps the original order.
+    """
+    arr_features = df_features.to_numpy(dtype=float)
+    mask = ~np.isnan(arr_features)
+
+    # remove (nearly) constant features, which also avoids dividing by zero in the correlations
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n_values = mask.sum(axis=0)
+        mean = np.where(mask, arr_features, 0.0).sum(axis=0) / n_values
+        centered = np.where(mask, arr_features - mean, 0.0)
+        var = (centered ** 2).sum(axis=0) / n_values
+    keep_var = var > var_thresh
+    centered = centered[:, keep_var]
+    mask = mask[:, keep_var].astype(float)
+
+    # remove the later feature of each highly correlated pair, where the sums only run over the
+    # molecules with both features available
+    drop_corr = np.zeros(centered.shape[1], dtype=bool)
+    if centered.shape[1] > 1:
+        n_pairs = mask.T @ mask
+        sum_x = centered.T @ mask
+        sum_xx = (centered ** 2).T @ mask
+        sum_xy = centered.T @ centered
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = sum_xy - sum_x * sum_x.T / n_pairs
+            var_x = sum_xx - sum_x ** 2 / n_pairs
+            # clip the rounding errors like `np.corrcoef` does
+            corr = np.clip(np.abs(cov / np.sqrt(var_x * var_x.T)), 0.0, 1.0)
+        drop_corr = np.any(np.triu(corr, k=1) > corr_thresh, axis=0)
+
+    df_filtered = df_features.iloc[:, np.flatnonzero(keep_var)[~drop_corr]]
+
+    return df_filtered
 
 
 class FingerprintGenerator:
@@ -326,6 +482,7 @@ class FingerprintGenerator:
                  rings: bool = True,
                  isomeric: bool = True,
                  kekulize: bool = False,
+                 n_jobs: int = 1,
                  ) -> None:
         """Fingerprint generator.
 
@@ -351,6 +508,9 @@ class FingerprintGenerator:
             Whether the SMILES added to the shingling are isomeric. Default=False.
         kekulize : bool, optional
             Whether the SMILES added to the shingling are kekulized. Default=True.
+        n_jobs : int, optional
+            Number of worker processes used for the fingerprint calculations, where -1 means using
+            all the processors. Default=1.
 
         """
         self.mols = mols
@@ -362,35 +522,90 @@ class FingerprintGenerator:
         self.rings = rings
         self.isomeric = isomeric
         self.kekulize = kekulize
+        self.n_jobs = n_jobs
+        # bit-packed fingerprints, which are available after `compute_fingerprint()`
+        self.packed_fps = None
+
+        # molecule names, which are computed lazily
+        self._mol_names = None
 
-        # molecule names
-        mol_names = [Chem.MolToSmiles(mol) if mol.GetPropsAsDict().get("_Name") is None
-                     else mol.GetProp("_Name") for mol in mols]
-        self.mol_names = mol_names
+    @property
+    def mol_names(self) -> list:
+        """Molecule names, where the SMILES string is used if a molecule has no name."""
+        if self._mol_names is None:
+            self._mol_names = [_mol_name(mol) for mol in self.mols]
+        return self._mol_names
+
+    @mol_names.setter
+    def mol_names(self, mol_names: list) -> None:
+        self._mol_names = mol_names
 
     def compute_fingerprint(self) -> PandasDataFrame:
         """Compute fingerprints."""
         if self.fp_type.upper() in ["SECFP", "ECFP", "MORGAN", "RDKFINGERPRINT", "MACCSKEYS"]:
-            fps = [self.rdkit_fingerprint_low(mol,
-                                              fp_type=self.fp_type,
-                                              n_bits=self.n_bits,
-                                              radius=self.radius,
-                                              min_radius=self.min_radius,
-                                              random_seed=self.random_seed,
-                                              rings=self.rings,
-                                              isomeric=self.isomeric,
-                                              kekulize=self.kekulize,
-                                              ) for mol in self.mols]
+            # MACCS keys always have 167 bits, regardless of `n_bits`
+            n_bits = 167 if self.fp_type.upper() == "MACCSKEYS" else self.n_bits
         # todo: add support of e3fp
 
         # other cases
         else:
             raise ValueError(f"{self.fp_type} is not an supported fingerprint type.")
 
-        df_fps = pd.DataFrame(np.array(fps), index=self.mol_names)
+        # the fingerprint encoders can not be pickled, so each worker process gets a chunk of
+        # molecules and builds its own encoder
+        encoder_params = self._encoder_params()
+        n_chunks = min(effective_n_jobs(self.n_jobs), max(len(self.mols), 1))
+        arr_fps = np.empty((len(self.mols), n_bits), dtype=np.uint8)
+        if n_chunks == 1:
+            # fill the preallocated array in place without dispatching through joblib
+            _fingerprint_chunk(self.mols, n_bits, out_fps=arr_fps, **encoder_params)
+        else:
+            chunks = list(gen_even_slices(len(self.mols), n_chunks))
+            chunk_fps = Parallel(n_jobs=self.n_jobs, prefer="processes")(
+                delayed(_fingerprint_chunk)(self.mols[chunk], n_bits, **encoder_params)
+                for chunk in chunks)
+            for chunk, fps in zip(chunks, chunk_fps):
+                arr_fps[chunk] = fps
+        df_fps = pd.DataFrame(arr_fps, index=self.mol_names, copy=False)
+        self.packed_fps = pack_fingerprints(arr_fps)
 
         return df_fps
 
+    @staticmethod
+    def tanimoto_matrix(packed_fps: np.ndarray) -> np.ndarray:
+        """Compute the pairwise Tanimoto similarity of bit-packed fingerprints.
+
+        Parameters
+        ----------
+        packed_fps : np.ndarray
+            Bit-packed fingerprints with shape (n_mols, n_words) and `np.uint64` data type, e.g.
+            `FingerprintGenerator.packed_fps` or the output of `pack_fingerprints()`.
+
+        Returns
+        -------
+        sim : np.ndarray
+            Tanimoto similarity matrix with shape (n_mols, n_mols). The similarity of two empty
+            fingerprints is 1, which is consistent with RDKit.
+        """
+        packed_fps = np.ascontiguousarray(packed_fps)
+        # np.bitwise_count maps to the hardware popcount instruction, but requires NumPy>=2.0
+        if hasattr(np, "bitwise_count"):
+            n_on = np.bitwise_count(packed_fps).sum(axis=1, dtype=np.int64)
+            # intersections are computed row by row to keep the memory at O(n_mols * n_words)
+            n_common = np.empty((len(packed_fps), len(packed_fps)), dtype=np.int64)
+            for idx, packed_fp in enumerate(packed_fps):
+                n_bits = np.bitwise_count(packed_fp & packed_fps)
+                n_common[idx] = n_bits.sum(axis=1, dtype=np.int64)
+        else:
+            # without a popcount ufunc, a dense product of the unpacked bits is much faster
+            bits = np.unpackbits(packed_fps.view(np.uint8), axis=1).astype(np.float32)
+            n_on = bits.sum(axis=1).astype(np.int64)
+            n_common = (bits @ bits.T).astype(np.int64)
+        n_union = n_on[:, None] + n_on[None, :] - n_common
+        sim = np.divide(n_common, n_union, out=np.ones(n_common.shape), where=n_union > 0)
+
+        return sim
+
     @staticmethod
     def rdkit_fingerprint_low(mol: RDKitMol,
                               fp_type: str = "SECFP",
@@ -442,47 +657,100 @@ class FingerprintGenerator:
         3. Atom pairs and topological torsions
         4. Morgan fingerprints (circular fingerprints): Morgan, ECFP, FCFP
 
+        """
+        encoder = FingerprintGenerator._fingerprint_encoder(fp_type=fp_type,
+                                                            n_bits=n_bits,
+                                                            radius=radius,
+                                                            min_radius=min_radius,
+                                                            random_seed=random_seed,
+                                                            rings=rings,
+                                                            isomeric=isomeric,
+                                                            kekulize=kekulize,
+                                                            )
+        fp = encoder(mol)
+
+        return fp
+
+    def _encoder_params(self) -> dict:
+        """Collect the parameters of `_fingerprint_encoder()` set for this generator."""
+        return {"fp_type": self.fp_type,
+                "n_bits": self.n_bits,
+                "radius": self.radius,
+                "min_radius": self.min_radius,
+                "random_seed": self.random_seed,
+                "rings": self.rings,
+                "isomeric": self.isomeric,
+                "kekulize": self.kekulize,
+                }
+
+    @staticmethod
+    def _fingerprint_encoder(fp_type: str = "SECFP",
+                             n_bits: int = 2048,
+                             radius: int = 3,
+                             min_radius: int = 1,
+                             random_seed: int = 12345,
+                             rings: bool = True,
+                             isomeric: bool = False,
+                             kekulize: bool = False,
+                             ) -> Callable[[RDKitMol], ExplicitBitVector]:
+        """Make a function that computes the required fingerprint of a molecule.
+
+        The parameters are the same as `rdkit_fingerprint_low()`. Any setup that does not depend on
+        the molecule is done once here, instead of for every molecule.
         """
         # SECFP: SMILES extended connectivity fingerprint
         # https://jcheminf.biomedcentral.com/articles/10.1186/s13321-018-0321-8
         if fp_type.upper() == "SECFP":
-            secfp_encoder = rdMHFPFingerprint.MHFPEncoder(random_seed)
-            fp = secfp_encoder.EncodeSECFPMol(mol,
-                                              radius=radius,
-                                              rings=rings,
-                                              isomeric=isomeric,
-                                              kekulize=kekulize,
-                                              min_radius=min_radius,
-                                              length=n_bits,
-                                              )
+            # MHFPEncoder is stateful, so each thread builds and reuses its own encoder
+            local = threading.local()
+
+            def encoder(mol: RDKitMol) -> ExplicitBitVector:
+                secfp_encoder = getattr(local, "secfp_encoder", None)
+                if secfp_encoder is None:
+                    secfp_encoder = rdMHFPFingerprint.MHFPEncoder(random_seed)
+                    local.secfp_encoder = secfp_encoder
+                return secfp_encoder.EncodeSECFPMol(mol,
+                                                    radius=radius,
+                                                    rings=rings,
+                                                    isomeric=isomeric,
+                                                    kekulize=kekulize,
+                                                    min_radius=min_radius,
+                                                    length=n_bits,
+                                                    )
         # ECFP
         # https://github.com/deepchem/deepchem/blob/1a2d2e9ff097fdbf58894d1f91359fe466c65810/deepchem/utils/rdkit_utils.py#L414
         # https://www.rdkit.org/docs/source/rdkit.Chem.rdMolDescriptors.html
         elif fp_type.upper() == "ECFP":
             # radius=3 --> ECFP6
-            fp = AllChem.GetMorganFingerprintAsBitVect(mol=mol, radius=radius, nBits=n_bits,
-                                                       useChirality=isomeric, useFeatures=False)
+            encoder = lambda mol: AllChem.GetMorganFingerprintAsBitVect(mol=mol,
+                                                                        radius=radius,
+                                                                        nBits=n_bits,
+                                                                        useChirality=isomeric,
+                                                                        useFeatures=False)
         elif fp_type.upper() == "MORGAN":
-            fp = AllChem.GetMorganFingerprintAsBitVect(mol=mol, radius=radius, nBits=n_bits,
-                                                       useChirality=isomeric, useFeatures=True)
+            encoder = lambda mol: AllChem.GetMorganFingerprintAsBitVect(mol=mol,
+                                                                        radius=radius,
+                                                                        nBits=n_bits,
+                                                                        useChirality=isomeric,
+                                                                        useFeatures=True)
         # https://www.rdkit.org/docs/source/rdkit.Chem.rdmolops.html#rdkit.Chem.rdmolops.RDKFingerprint
         elif fp_type.upper() == "RDKFINGERPRINT":
-            fp = Chem.rdmolops.RDKFingerprint(mol=mol,
-                                              minPath=1,
-                                              # maxPath=mol.GetNumBonds(),
-                                              maxPath=10,
-                                              fpSize=n_bits,
-                                              nBitsPerHash=2,
-                                              useHs=True,
-                                              tgtDensity=0,
-                                              minSize=128,
-                                              branchedPaths=True,
-                                              useBondOrder=True,
-                                              )
+            encoder = lambda mol: Chem.rdmolops.RDKFingerprint(mol=mol,
+                                                               minPath=1,
+                                                               # maxPath=mol.GetNumBonds(),
+                                                               maxPath=10,
+                                                               fpSize=n_bits,
+                                                               nBitsPerHash=2,
+                                                               useHs=True,
+                                                               tgtDensity=0,
+                                                               minSize=128,
+                                                               branchedPaths=True,
+                                                               useBondOrder=True,
+                                                               )
         # SMARTS-based implementation of the 166 public MACCS keys
         # https://www.rdkit.org/docs/GettingStartedInPython.html#fingerprinting-and-molecular-similarity
-        elif fp_type == "MaCCSKeys":
-            fp = MACCSkeys.GenMACCSKeys(mol)
+        elif fp_type.upper() == "MACCSKEYS":
+            encoder = MACCSkeys.GenMACCSKeys
         else:
             # todo: add more
             # https://github.com/keiserlab/e3fp
@@ -490,7 +758,7 @@ class FingerprintGenerator:
             # https://xenonpy.readthedocs.io/en/stable/_modules/xenonpy/descriptor/fingerprint.html
             raise NotImplementedError(f"{fp_type} is not implemented yet.")
 
-        return fp
+        return encoder
 
     # todo: add support of e3fp fingerprint
     # @staticmethod
@@ -549,6 +817,54 @@ class FingerprintGenerator:
     #     return df_e3fp, mol_names_doable, mol_names_two_atoms
 
 
+def _fingerprint_chunk(mols: list,
+                       n_cols: int,
+                       out_fps: np.ndarray = None,
+                       **kwargs) -> np.ndarray:
+    """Compute the fingerprints of a chunk of molecules in a worker process.
+
+    Each fingerprint is exported straight into its row of `out_fps` when it is given, and of a
+    newly allocated array with `n_cols` columns otherwise. The other parameters are passed to
+    `FingerprintGenerator._fingerprint_encoder()`.
+    """
+    encoder = FingerprintGenerator._fingerprint_encoder(**kwargs)
+    fps = out_fps
+    if fps is None:
+        fps = np.empty((len(mols), n_cols), dtype=np.uint8)
+    for idx, mol in enumerate(mols):
+        DataStructs.ConvertToNumpyArray(encoder(mol), fps[idx])
+
+    return fps
+
+
+def _mol_name(mol: RDKitMol) -> str:
+    """Get the name of a molecule, falling back to its SMILES string if it is missing or empty."""
+    name = mol.GetProp("_Name") if mol.HasProp("_Name") else ""
+    return name or Chem.MolToSmiles(mol)
+
+
+def pack_fingerprints(arr_fps: np.ndarray) -> np.ndarray:
+    """Pack binary fingerprints into 64-bit words.
+
+    Parameters
+    ----------
+    arr_fps : np.ndarray
+        Binary fingerprints with shape (n_mols, n_bits).
+
+    Returns
+    -------
+    packed_fps : np.ndarray
+        Bit-packed fingerprints with shape (n_mols, ceil(n_bits / 64)) and `np.uint64` data type,
+        where the bits beyond `n_bits` are padded with zeros.
+    """
+    n_mols, n_bits = arr_fps.shape
+    n_words = -(-n_bits // 64)
+    packed_fps = np.zeros((n_mols, n_words * 8), dtype=np.uint8)
+    packed_fps[:, :-(-n_bits // 8)] = np.packbits(arr_fps, axis=1, bitorder="little")
+
+    return packed_fps.view(np.uint64)
+
+
 def feature_reader(file_name: str,
                    sep: str = ",",
                    engine: str = "python",
@@ -602,6 +918,7 @@ def compute_features(mol_file: str,
                      ipc_avg: bool = True,
                      normalize_features: bool = False,
                      feature_output: str = None,
+                     n_jobs: int = None,
                      **kwargs,
                      ) -> PandasDataFrame:
     """Compute molecular features.
@@ -639,6 +956,10 @@ def compute_features(mol_file: str,
         Whether the features are normalized. Default=True.
     feature_output : str, optional
         CSV file name to save the computed features. Default=None.
+    n_jobs : int, optional
+        Number of parallel jobs used to compute the features, where -1 means using all the
+        processors. If None, Mordred uses all the processors and the other features are computed
+        serially. Default=None.
     **kwargs:
         Other keyword arguments.
 
@@ -657,6 +978,7 @@ def compute_features(mol_file: str,
                                              desc_type=feature_name,
                                              use_fragment=use_fragment,
                                              ipc_avg=ipc_avg,
+                                             n_jobs=n_jobs,
                                              )
         df_features = descriptor_gen.compute_descriptor(**kwargs)
     # compute fingerprints
@@ -673,6 +995,7 @@ def compute_features(mol_file: str,
                                       rings=rings,
                                       isomeric=isomeric,
                                       kekulize=kekulize,
+                                      n_jobs=n_jobs,
                                       )
         df_features = fp_gen.compute_fingerprint()
     else:
@@ -23,15 +23,23 @@
 
 """Testing for feature generation module."""
 
+import os
+
+from DiverseSelector import feature
 from DiverseSelector.feature import (compute_features,
                                      DescriptorGenerator,
+                                     feature_filtering,
                                      feature_reader,
                                      FingerprintGenerator,
+                                     pack_fingerprints,
                                      )
 from DiverseSelector.test.common import load_testing_mols
+from joblib import parallel_backend
+import numpy as np
 from numpy.testing import assert_almost_equal, assert_equal
 import pandas as pd
 import pytest
+from rdkit import Chem, DataStructs
 
 try:
     from importlib_resources import path
@@ -112,6 +120,36 @@ def test_feature_desc_padelpy_3d():
                         decimal=7)
 
 
+def test_feature_desc_padelpy_tmp_csv(monkeypatch, tmp_path):
+    """Testing the temporary csv file of PaDEL descriptors is unique and always removed."""
+    csv_fnames = []
+
+    def mock_padeldescriptor(mol_dir, d_file, **kwargs):
+        csv_fnames.append(d_file)
+        with open(d_file, "w", encoding="utf8") as f:
+            f.write("Name,nAcid,nBase\nmol_1,1,0\nmol_2,0,2\n")
+
+    def mock_padeldescriptor_error(mol_dir, d_file, **kwargs):
+        mock_padeldescriptor(mol_dir, d_file, **kwargs)
+        raise RuntimeError("PaDEL failed.")
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(feature, "padeldescriptor", mock_padeldescriptor)
+    df_padel_desc = DescriptorGenerator.padelpy_descriptors(mol_file="mols.sdf")
+    assert_equal(list(df_padel_desc.index), ["mol_1", "mol_2"])
+    assert_equal(df_padel_desc.to_numpy(), [[1, 0], [0, 2]])
+    DescriptorGenerator.padelpy_descriptors(mol_file="mols.sdf")
+    # the temporary file is cleaned up even when PaDEL fails
+    monkeypatch.setattr(feature, "padeldescriptor", mock_padeldescriptor_error)
+    with pytest.raises(RuntimeError):
+        DescriptorGenerator.padelpy_descriptors(mol_file="mols.sdf")
+    # each call uses its own temporary file, which is removed afterwards
+    assert_equal(len(set(csv_fnames)), 3)
+    for csv_fname in csv_fnames:
+        assert not os.path.exists(csv_fname)
+    assert_equal(os.listdir(tmp_path), [])
+
+
 def test_feature_desc_rdkit():
     """Testing molecular RDKit descriptor with 3d molecules."""
     # load molecules
@@ -134,6 +172,24 @@ def test_feature_desc_rdkit():
                         decimal=7)
 
 
+def test_feature_desc_rdkit_parallel():
+    """Testing RDKit descriptors computed in parallel match the serial ones."""
+    # load molecules
+    mols = load_testing_mols(mol_type="3d")
+    for desc_type in ["rdkit", "rdkit_frag"]:
+        # generate molecular descriptors with one and two jobs
+        df_desc_serial = DescriptorGenerator(mols=mols,
+                                             desc_type=desc_type,
+                                             n_jobs=1,
+                                             ).compute_descriptor()
+        df_desc_parallel = DescriptorGenerator(mols=mols,
+                                               desc_type=desc_type,
+                                               n_jobs=2,
+                                               ).compute_descriptor()
+        # check if the dataframes are equal
+        pd.testing.assert_frame_equal(df_desc_parallel, df_desc_serial)
+
+
 def test_feature_desc_rdkit_frag():
     """Testing molecular RDKit fragment descriptor with 3D molecules."""
     # load molecules
@@ -199,6 +255,56 @@ def test_feature_fp_secfp6():
                         )
 
 
+def test_feature_fp_parallel():
+    """Testing fingerprints computed in parallel match the serial ones."""
+    # load molecules
+    mols = load_testing_mols(mol_type="3d")
+    for fp_type in ["SECFP", "ECFP", "MaCCSKeys"]:
+        # generate molecular fingerprints with one and two jobs
+        fp_generator_serial = FingerprintGenerator(mols=mols,
+                                                   fp_type=fp_type,
+                                                   n_bits=1024,
+                                                   random_seed=42,
+                                                   n_jobs=1,
+                                                   )
+        df_fps_serial = fp_generator_serial.compute_fingerprint()
+        fp_generator_parallel = FingerprintGenerator(mols=mols,
+                                                     fp_type=fp_type,
+                                                     n_bits=1024,
+                                                     random_seed=42,
+                                                     n_jobs=2,
+                                                     )
+        df_fps_parallel = fp_generator_parallel.compute_fingerprint()
+        # check if the dataframes are equal
+        pd.testing.assert_frame_equal(df_fps_parallel, df_fps_serial)
+        assert_equal(fp_generator_parallel.packed_fps, fp_generator_serial.packed_fps)
+
+
+def test_feature_fp_parallel_backend():
+    """Testing fingerprints computed under an enclosing process backend match the serial ones."""
+    # load molecules
+    mols = load_testing_mols(mol_type="3d")
+    for fp_type in ["SECFP", "ECFP", "MaCCSKeys"]:
+        fp_generator_serial = FingerprintGenerator(mols=mols,
+                                                   fp_type=fp_type,
+                                                   n_bits=1024,
+                                                   random_seed=42,
+                                                   n_jobs=1,
+                                                   )
+        df_fps_serial = fp_generator_serial.compute_fingerprint()
+        fp_generator_parallel = FingerprintGenerator(mols=mols,
+                                                     fp_type=fp_type,
+                                                     n_bits=1024,
+                                                     random_seed=42,
+                                                     n_jobs=2,
+                                                     )
+        with parallel_backend("loky", n_jobs=2):
+            df_fps_parallel = fp_generator_parallel.compute_fingerprint()
+        # check if the dataframes are equal
+        pd.testing.assert_frame_equal(df_fps_parallel, df_fps_serial)
+        assert_equal(fp_generator_parallel.packed_fps, fp_generator_serial.packed_fps)
+
+
 def test_feature_fp_ecfp6():
     """Testing ECFP6 fingerprints with 3D molecules."""
     # load molecules
@@ -311,6 +417,111 @@ def test_feature_fp_maccskeys():
                         )
 
 
+def test_feature_fp_packed():
+    """Testing bit-packed fingerprints with 3D molecules."""
+    # load molecules
+    mols = load_testing_mols(mol_type="3d")
+    # generate molecular fingerprints with the FingerprintGenerator
+    fp_generator = FingerprintGenerator(mols=mols,
+                                        fp_type="ECFP",
+                                        n_bits=1024,
+                                        radius=3,
+                                        )
+    df_ecfp6 = fp_generator.compute_fingerprint()
+    # check the packed fingerprints can be unpacked to the original bits
+    assert_equal(fp_generator.packed_fps.shape, (df_ecfp6.shape[0], 16))
+    assert_equal(fp_generator.packed_fps.dtype, np.uint64)
+    unpacked = np.unpackbits(fp_generator.packed_fps.view(np.uint8), axis=1, bitorder="little")
+    assert_equal(unpacked, df_ecfp6.to_numpy())
+
+
+def test_feature_fp_tanimoto_matrix():
+    """Testing Tanimoto similarity of bit-packed fingerprints with 3D molecules."""
+    # load molecules
+    mols = load_testing_mols(mol_type="3d")
+    # generate molecular fingerprints with the FingerprintGenerator
+    fp_generator = FingerprintGenerator(mols=mols,
+                                        fp_type="ECFP",
+                                        n_bits=1024,
+                                        radius=3,
+                                        )
+    fp_generator.compute_fingerprint()
+    sim = FingerprintGenerator.tanimoto_matrix(fp_generator.packed_fps)
+    # compare with the Tanimoto similarity of RDKit
+    fps = [fp_generator.rdkit_fingerprint_low(mol, fp_type="ECFP", n_bits=1024, radius=3,
+                                              isomeric=True)
+           for mol in mols]
+    sim_exp = np.array([DataStructs.BulkTanimotoSimilarity(fp, fps) for fp in fps])
+    assert_almost_equal(sim, sim_exp)
+    # two empty fingerprints are identical
+    sim = FingerprintGenerator.tanimoto_matrix(np.zeros((2, 3), dtype=np.uint64))
+    assert_equal(sim, np.ones((2, 2)))
+    # non-contiguous fingerprints, e.g. a slice of the words, are supported
+    packed_fps = fp_generator.packed_fps[:, ::2]
+    bits = np.unpackbits(np.ascontiguousarray(packed_fps).view(np.uint8), axis=1)
+    n_common = bits.astype(int) @ bits.T.astype(int)
+    n_on = bits.sum(axis=1)
+    sim_exp = n_common / (n_on[:, None] + n_on[None, :] - n_common)
+    assert_almost_equal(FingerprintGenerator.tanimoto_matrix(packed_fps), sim_exp)
+
+
+def test_feature_fp_tanimoto_matrix_popcount_branches(monkeypatch):
+    """Testing Tanimoto similarity of bit-packed fingerprints with and without popcount."""
+    fps = np.random.default_rng(42).integers(0, 2, size=(10, 200), dtype=np.uint8)
+    fps[0] = 0
+    fps[1] = 0
+    packed_fps = pack_fingerprints(fps)
+    # bit-wise definition
+    n_common = fps.astype(int) @ fps.T.astype(int)
+    n_union = fps.sum(axis=1)[:, None] + fps.sum(axis=1)[None, :] - n_common
+
+    def bitwise_count(arr):
+        # reference popcount of each element, so that both branches run on any NumPy version
+        arr_bytes = np.ascontiguousarray(arr)[..., None].view(np.uint8)
+        return np.unpackbits(arr_bytes, axis=-1).sum(axis=-1, dtype=np.uint8)
+
+    sims = []
+    monkeypatch.setattr(np, "bitwise_count", bitwise_count, raising=False)
+    sims.append(FingerprintGenerator.tanimoto_matrix(packed_fps))
+    monkeypatch.delattr(np, "bitwise_count")
+    sims.append(FingerprintGenerator.tanimoto_matrix(packed_fps))
+    for sim in sims:
+        assert_almost_equal(sim[2:, 2:], n_common[2:, 2:] / n_union[2:, 2:])
+        assert_equal(sim[:2, :2], np.ones((2, 2)))
+    assert_almost_equal(sims[0], sims[1])
+
+
+def test_feature_pack_fingerprints():
+    """Testing packing fingerprints of which the size is not a multiple of 64."""
+    fps = np.zeros((2, 70), dtype=np.uint8)
+    fps[0, [0, 5, 69]] = 1
+    fps[1, 64] = 1
+    packed = pack_fingerprints(fps)
+    assert_equal(packed.shape, (2, 2))
+    unpacked = np.unpackbits(packed.view(np.uint8), axis=1, bitorder="little")
+    assert_equal(unpacked[:, :70], fps)
+    assert_equal(unpacked[:, 70:], 0)
+
+
+def test_feature_fp_mol_names():
+    """Testing molecule names of fingerprints with 2D and 3D molecules."""
+    # molecules loaded from the SDF file have names
+    mols = load_testing_mols(mol_type="3d")
+    fp_generator = FingerprintGenerator(mols=mols, fp_type="ECFP", n_bits=1024)
+    assert_equal(fp_generator.mol_names, ["6274", "1060", "6140", "2244"])
+    # molecules loaded from SMILES strings fall back to the SMILES strings
+    mols = load_testing_mols(mol_type="2d")
+    fp_generator = FingerprintGenerator(mols=mols, fp_type="ECFP", n_bits=1024)
+    df_ecfp6 = fp_generator.compute_fingerprint()
+    assert_equal(list(df_ecfp6.index), [Chem.MolToSmiles(mol) for mol in mols])
+    # molecules with a blank title line in the SDF file fall back to the SMILES strings
+    mols = [Chem.MolFromMolBlock(Chem.MolToMolBlock(Chem.MolFromSmiles(smiles)))
+            for smiles in ["CCO", "CCN"]]
+    assert_equal([mol.GetProp("_Name") for mol in mols], ["", ""])
+    fp_generator = FingerprintGenerator(mols=mols, fp_type="ECFP", n_bits=1024)
+    assert_equal(fp_generator.mol_names, ["CCO", "CCN"])
+
+
 def test_feature_fp_invalid():
     """Testing invalid fingerprints with 3D molecules."""
     # load molecules
@@ -331,6 +542,36 @@ def test_feature_fp_invalid():
         fp_generator.compute_fingerprint()
 
 
+def test_feature_filtering():
+    """Testing feature filtering with low variance and highly correlated features."""
+    rng = np.random.default_rng(42)
+    arr_features = rng.random((20, 3))
+    df_features = pd.DataFrame({"a": arr_features[:, 0],
+                                "const": np.full(20, 2.0),
+                                "b": arr_features[:, 1],
+                                "a_neg": -3.0 * arr_features[:, 0] + 1.0,
+                                "c": arr_features[:, 2],
+                                "b_copy": arr_features[:, 1],
+                                })
+    df_filtered = feature_filtering(df_features, var_thresh=1e-5, corr_thresh=0.95)
+    assert_equal(list(df_filtered.columns), ["a", "b", "c"])
+    assert_equal(df_filtered.to_numpy(), arr_features)
+    # only the constant feature is removed without the correlation filtering
+    df_filtered = feature_filtering(df_features, var_thresh=1e-5, corr_thresh=1.0)
+    assert_equal(list(df_filtered.columns), ["a", "b", "a_neg", "c", "b_copy"])
+    # missing values are ignored instead of removing the whole feature
+    arr_d = rng.random(20)
+    arr_d[3] = np.nan
+    arr_c_nan = arr_features[:, 2].copy()
+    arr_c_nan[[0, 7]] = np.nan
+    df_features["d_nan"] = arr_d
+    df_features["c_nan"] = 2.0 * arr_c_nan
+    df_features["all_nan"] = np.nan
+    df_filtered = feature_filtering(df_features, var_thresh=1e-5, corr_thresh=0.95)
+    assert_equal(list(df_filtered.columns), ["a", "b", "c", "d_nan"])
+    assert_equal(df_filtered["d_nan"].to_numpy(), arr_d)
+
+
 def test_feature_reader_csv():
     """Testing the feature reader function."""
     # load mock features